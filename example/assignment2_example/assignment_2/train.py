@@ -1,6 +1,7 @@
 import os
 import signal
 import time
+from pathlib import Path
 
 import torch
 from torch.utils.data import DataLoader
@@ -24,32 +25,55 @@ from typing import Tuple, Dict
 
 ############################## LONGRUN : SAVE & RECOVER STATE ##############################
 def store_state(
-    filepath: str, epoch: int, model: torch.nn.Module, strip_dp: bool = True
+    filepath: Path, epoch: int, model: torch.nn.Module, strip_dp: bool = True
 ) -> None:
-    """Save the last completed epoch and model weights to disk."""
+    """Save the last completed epoch and model weights to disk.
+
+    Writes to a temporary file and renames it into place, so a job killed
+    mid-save never leaves a truncated checkpoint behind.
+    """
     state_dict = (
         model.module.state_dict()
         if strip_dp and hasattr(model, "module")
         else model.state_dict()
     )
-    torch.save({"epoch": epoch, "model_state_dict": state_dict}, filepath)
+    tmp_filepath = f"{filepath}.tmp"
+    with open(tmp_filepath, "wb", buffering=1 << 20) as f:
+        torch.save({"epoch": epoch, "model_state_dict": state_dict}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filepath, filepath)
+
 
+def recover_state(filepath: Path) -> Tuple[int, Dict[str, torch.Tensor]]:
+    """Load and return (last_epoch, model_state_dict) from a checkpoint.
 
-def recover_state(
-    filepath: str, device: str = "cpu"
-) -> Tuple[int, Dict[str, torch.Tensor]]:
-    """Load and return (last_epoch, model_state_dict) from a checkpoint."""
-    if not os.path.exists(filepath):
+    Tensors are memory-mapped on CPU and only read when copied into the model.
+    """
+    if not os.path.isfile(filepath):
         return 0, None
-    ckpt = torch.load(filepath, map_location=device)
+    ckpt = torch.load(filepath, map_location="cpu", mmap=True, weights_only=True)
     return ckpt["epoch"], ckpt["model_state_dict"]
 
-STATE_PATH = f"{os.environ.get("SLURM_SUBMIT_DIR", ".")}/state-{os.environ.get("SLURM_LONGRUN_INITIAL_JOB_ID", os.environ.get("SLURM_JOB_ID", ""))}.json"
+
+def get_state_path() -> Path:
+    """Checkpoint path shared by every resubmission of the same longrun job."""
+    submit_dir = Path(os.environ.get("SLURM_SUBMIT_DIR", "."))
+    job_id = os.environ.get("SLURM_LONGRUN_INITIAL_JOB_ID") or os.environ.get(
+        "SLURM_JOB_ID", ""
+    )
+    return submit_dir / f"state-{job_id}.pt"
+
+
+def ignore_sigterm(worker_id: int) -> None:
+    """DataLoader workers ignore SIGTERM; the main process saves the state."""
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
 ############################## END LONGRUN : SAVE & RECOVER STATE ##########################
 
 
 def train(args):
     logger.info(f"Experiment args: {args}")
+    state_path = get_state_path()
     # Init
     device = torch.device(f"cuda:{int(os.getenv('LOCAL_RANK', 0))}")
     model_dtype = PRECISION_STR_TO_DTYPE[args.model_dtype]
@@ -65,7 +89,13 @@ def train(args):
     )
     train_collator = CollatorForCLM(args.sequence_length, tokenizer.pad_token_id)
     train_dl = DataLoader(
-        train_ds, batch_size=args.batch_size, collate_fn=train_collator
+        train_ds,
+        batch_size=args.batch_size,
+        collate_fn=train_collator,
+        num_workers=args.num_workers,
+        pin_memory=True,
+        persistent_workers=args.num_workers > 0,
+        worker_init_fn=ignore_sigterm,
     )
     train_dl_iterator = iter(train_dl)
 
@@ -85,28 +115,28 @@ def train(args):
     with set_default_dtype(model_dtype):
         model = Transformer(model_config)
         ############################## LONGRUN : RECOVER STATE ##############################
-        train_step, model_state_dict = recover_state(STATE_PATH, device)
+        train_step, model_state_dict = recover_state(state_path)
         if model_state_dict is not None:
             model.load_state_dict(model_state_dict, strict=False)
-            logger.info(f"Recovered model state from {STATE_PATH}")
+            logger.info(f"Recovered model state from {state_path}")
         else:
             train_step = 0
-            logger.info(f"Starting from scratch, no state found in {STATE_PATH}")
+            logger.info(f"Starting from scratch, no state found in {state_path}")
         del model_state_dict
         ############################## END LONGRUN : RECOVER STATE ##########################
         model = model.to(device)
 
     ############################ LONGRUN : SAVE STATE ON SIGTERM ########################
     def sigterm_handler(signum, frame):
-        logger.info(f"[Received SIGTERM] : Saving state to {STATE_PATH}")
-        store_state(STATE_PATH, train_step, model)
+        logger.info(f"[Received SIGTERM] : Saving state to {state_path}")
+        store_state(state_path, train_step, model)
         logger.info(f"[Received SIGTERM] : Finished saving state.")
 
     signal.signal(
         signal.SIGTERM,
         sigterm_handler,
     )
-    logger.info(f"Registered SIGTERM handler to save state to {STATE_PATH} on termination.")
+    logger.info(f"Registered SIGTERM handler to save state to {state_path} on termination.")
     ############################ END LONGRUN : SAVE STATE ON SIGTERM ######################
 
 
@@ -129,7 +159,7 @@ def train(args):
     )
 
     ntokens_since_last_log = 0
-    ntraining_tokens_since_last_log = 0
+    ntraining_tokens_since_last_log = torch.zeros((), dtype=torch.long, device=device)
     time_last_log = time.perf_counter()
 
     logger.info("Starting training!")
@@ -143,16 +173,24 @@ def train(args):
 
         input_ids, labels = next(train_dl_iterator)
         ntokens_since_last_log += args.batch_size * args.sequence_length
+        input_ids = input_ids.to(device, non_blocking=True)
+        labels = labels.to(device, non_blocking=True)
+        # Counted on the GPU; only read back on logging steps
         num_items_in_batch = labels.ne(-100).sum()
         ntraining_tokens_since_last_log += num_items_in_batch
-        input_ids = input_ids.to(device)
-        labels = labels.to(device)
 
         optimizer.zero_grad()
 
         logits = model(input_ids)
-        loss = torch.nn.functional.cross_entropy(
-            logits.flatten(0, 1).float(), labels.flatten(0, 1), reduction="sum"
+        # Upcast to fp32 chunk by chunk so the full fp32 logits never coexist
+        loss = sum(
+            torch.nn.functional.cross_entropy(
+                logits_chunk.float(), labels_chunk, reduction="sum"
+            )
+            for logits_chunk, labels_chunk in zip(
+                logits.flatten(0, 1).chunk(args.loss_chunks),
+                labels.flatten(0, 1).chunk(args.loss_chunks),
+            )
         )
         loss = loss / num_items_in_batch
         del logits
@@ -171,13 +209,13 @@ def train(args):
             tps = ntokens_since_last_log / time_delta
             mfu = 100 * num_flop_per_token * tps / 989e12
             tflops = num_flop_per_token * tps / 1e12
-            training_tps = ntraining_tokens_since_last_log / time_delta
+            training_tps = ntraining_tokens_since_last_log.item() / time_delta
 
             logger.info(
                 f"Step: {train_step} | Loss: {loss.item():.2f} | Tokens per second: {tps:.2f} | Training tokens per second (%): {100*training_tps/tps:.2f} | MFU (%): {mfu:.2f} | TFLOPs: {tflops:.2f}"
             )
             ntokens_since_last_log = 0
-            ntraining_tokens_since_last_log = 0
+            ntraining_tokens_since_last_log.zero_()
             time_last_log = time.perf_counter()
 
         # Profiling
@@ -127,6 +127,12 @@ def get_args():
         type=int,
         default=1,
     )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=4,
+        help="Number of DataLoader worker processes used to tokenize and pin batches",
+    )
     parser.add_argument(
         "--fused-optimizer",
         action="store_true",
@@ -168,6 +174,12 @@ def get_args():
         default=12,
         help="Last step to profile using the NSYS profiler",
     )
+    parser.add_argument(
+        "--loss-chunks",
+        type=int,
+        default=4,
+        help="Compute the cross-entropy loss in this many chunks to bound the memory of the fp32 logits",
+    )
     parser.add_argument(
         "--grad-max-norm",
         type=float,
@@ -1,8 +1,12 @@
 # import slurm_longrun
 import json
 import os
+import sys
 import time
 
+# Emit each line to the job log as soon as it is printed
+sys.stdout.reconfigure(line_buffering=True)
+
 
 def load_state():
     try:
@@ -17,7 +21,7 @@ def save_state(state):
         json.dump(state, f)
 
 
-print(os.getenv("SLURM_LONGRUN_INITIAL_JOB_ID"), flush=True)
+print(os.getenv("SLURM_LONGRUN_INITIAL_JOB_ID"))
 state = load_state()
 print(state)
 
@@ -26,7 +30,7 @@ def main():
     for i in range(state.get("i", 0), 3):
         state["i"] = i
         save_state(state)
-        print(i + 1, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()), flush=True)
+        print(i + 1, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()))
         time.sleep(60)
 
 
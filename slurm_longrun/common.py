@@ -32,21 +32,7 @@ class JobStatus(Enum):
         """
         True if this status is a terminal (no-further-progress) state.
         """
-        return self in {
-            JobStatus.COMPLETED,
-            JobStatus.FAILED,
-            JobStatus.TIMEOUT,
-            JobStatus.PREEMPTED,
-            JobStatus.STOPPED,
-            JobStatus.CANCELLED,
-            JobStatus.BOOT_FAIL,
-            JobStatus.NODE_FAIL,
-            JobStatus.DEADLINE,
-            JobStatus.OUT_OF_MEMORY,
-            JobStatus.SPECIAL_EXIT,
-            JobStatus.REVOKED,
-            JobStatus.UNKNOWN,
-        }
+        return self in _FINAL_STATES
 
     @property
     def is_success(self) -> bool:
@@ -54,17 +40,43 @@ class JobStatus(Enum):
         True if this status counts as a success for our purposes.
         We treat TIMEOUT as a “successful” endpoint (to trigger resubmit).
         """
-        return self in {JobStatus.COMPLETED}
+        return self in _SUCCESS_STATES
 
     @property
     def should_resubmit(self) -> bool:
         """
         True if this status should trigger a resubmission.
         """
-        return self in {
-            JobStatus.TIMEOUT,
-            JobStatus.DEADLINE,
-            JobStatus.PREEMPTED,
-            JobStatus.NODE_FAIL,
-            JobStatus.REVOKED,
-        }
+        return self in _RESUBMIT_STATES
+
+
+# Built once at import; the properties above are hit on every poll.
+_FINAL_STATES = frozenset(
+    {
+        JobStatus.COMPLETED,
+        JobStatus.FAILED,
+        JobStatus.TIMEOUT,
+        JobStatus.PREEMPTED,
+        JobStatus.STOPPED,
+        JobStatus.CANCELLED,
+        JobStatus.BOOT_FAIL,
+        JobStatus.NODE_FAIL,
+        JobStatus.DEADLINE,
+        JobStatus.OUT_OF_MEMORY,
+        JobStatus.SPECIAL_EXIT,
+        JobStatus.REVOKED,
+        JobStatus.UNKNOWN,
+    }
+)
+
+_SUCCESS_STATES = frozenset({JobStatus.COMPLETED})
+
+_RESUBMIT_STATES = frozenset(
+    {
+        JobStatus.TIMEOUT,
+        JobStatus.DEADLINE,
+        JobStatus.PREEMPTED,
+        JobStatus.NODE_FAIL,
+        JobStatus.REVOKED,
+    }
+)
@@ -25,6 +25,6 @@ def setup_logger(verbosity: Verbosity = Verbosity.DEFAULT) -> None:
         level=verbosity.value,
         format=LOG_FORMAT,
         colorize=True,
-        backtrace=True,
-        diagnose=True,
+        backtrace=False,
+        diagnose=False,
     )
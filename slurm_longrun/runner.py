@@ -15,6 +15,8 @@ from slurm_longrun.utils import (
     time_to_seconds,
 )
 
+_STATUS_BY_VALUE = {status.value: status for status in JobStatus}
+
 
 class SlurmRunner:
     """
@@ -43,12 +45,13 @@ class SlurmRunner:
 
     def fetch_info(self, job_id: str) -> dict:
         """
-        Merge sacct details + scontrol details into one dict.
+        Fetch job details from scontrol, falling back to sacct once the job
+        has aged out of the controller (MinJobAge).
         """
-        sacct_list = get_sacct_job_details(job_id)
-        sacct = next((j for j in sacct_list if j.get("JobID") == job_id), {})
-        sctrl = get_scontrol_show_job_details(job_id)
-        info = {**sacct, **sctrl}
+        info = get_scontrol_show_job_details(job_id)
+        if not info:
+            sacct_list = get_sacct_job_details(job_id)
+            info = next((j for j in sacct_list if j.get("JobID") == job_id), {})
         logger.trace("Fetched info for {}: {}", job_id, info)
         return info
 
@@ -56,12 +59,13 @@ class SlurmRunner:
         """
         Extract and normalize Slurm job state → JobStatus enum.
         """
-        raw = info.get("JobState") or info.get("State", "").split(maxsplit=1)[0]
-        try:
-            return JobStatus(raw)
-        except ValueError:
+        # sacct reports e.g. "CANCELLED by 1234"; keep the first word only
+        raw = info.get("JobState") or info.get("State", "").partition(" ")[0]
+        status = _STATUS_BY_VALUE.get(raw)
+        if status is None:
             logger.warning("Unknown job state {!r}, default to UNKNOWN.", raw)
             return JobStatus.UNKNOWN
+        return status
 
     def monitor(self, job_id: str) -> JobStatus:
         """
@@ -78,13 +82,16 @@ class SlurmRunner:
             )
             info = self.fetch_info(job_id)
             status = self.parse_status(info)
+            # TimeLimit is fixed for a given job; parse it once it shows up
+            limit_s = None
 
             # Poll until final
             while not status.is_final:
                 # compute remaining time
-                limit = info.get("TimeLimit", "00:00:00")
+                if limit_s is None and "TimeLimit" in info:
+                    limit_s = time_to_seconds(info["TimeLimit"])
                 runtime = info.get("RunTime", "00:00:00")
-                rem = time_to_seconds(limit) - time_to_seconds(runtime)
+                rem = (limit_s or 0) - time_to_seconds(runtime)
                 wait = max(5, min(rem, 300))
                 logger.debug("Sleeping {}s (remaining {}s)", wait, rem)
                 time.sleep(wait)
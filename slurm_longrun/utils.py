@@ -1,22 +1,93 @@
 # slurm_longrun/utils.py
 
-import multiprocessing
+import copy
+import csv
+import functools
+import inspect
 import os
 import re
 import subprocess
 import sys
 import time
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
 
 from loguru import logger
 
+from slurm_longrun.common import JobStatus
+
+_SBATCH_JOB_RE = re.compile(r"Submitted batch job (\d+)")
+# <job>[_<array task>][.<step>]; anything else is rejected before forking
+_VALID_JOBID_RE = re.compile(r"\A\d+(?:_\d+)?(?:\.\w+)?\Z")
+# key=value tokens of `scontrol show job`; the value may itself contain "="
+_SCONTROL_KV_RE = re.compile(r"(\S+?)=(\S*)")
+
+_SACCT_HEADERS = (
+    "JobID",
+    "JobName",
+    "State",
+    "ExitCode",
+    "Reason",
+    "Comment",
+    "Elapsed",
+)
+_SACCT_FORMAT = f"--format={','.join(_SACCT_HEADERS)}"
+# Upper bound on job IDs joined into one `sacct -j` argument
+_SACCT_JOBS_PER_CALL = 100
+
+# sacct rows of jobs in a final state never change; keep the most recent ones
+_SACCT_CACHE_SIZE = 1024
+_SACCT_FINAL_STATES = frozenset(
+    status.value
+    for status in JobStatus
+    if status.is_final and status is not JobStatus.UNKNOWN
+)
+_sacct_cache: "OrderedDict[str, List[Dict[str, str]]]" = OrderedDict()
+
+
+def rate_limited(min_interval: float):
+    """
+    Decorator: a call repeated with the same arguments within `min_interval`
+    seconds returns the previous result instead of querying Slurm again.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        last_calls: Dict[tuple, Tuple[float, object]] = {}
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Bind so f("5") and f(job_id="5") share one entry
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            call_key = tuple(bound.arguments.items())
+
+            now = time.monotonic()
+            hit = last_calls.get(call_key)
+            if hit is not None and now - hit[0] < min_interval:
+                # Copies, so callers mutating a result can't alter the cached one
+                return copy.deepcopy(hit[1])
+            # Drop expired entries so the table doesn't grow with every job
+            expired = [
+                key for key, (ts, _) in last_calls.items() if now - ts >= min_interval
+            ]
+            for key in expired:
+                del last_calls[key]
+            result = func(*bound.args, **bound.kwargs)
+            last_calls[call_key] = (now, copy.deepcopy(result))
+            return result
+
+        return wrapper
+
+    return decorator
+
 
 def run_command(cmd: List[str]) -> str:
     """
     Execute a command and return its stdout.
     Raises CalledProcessError on non-zero exit.
     """
-    logger.debug("Running command: {}", " ".join(cmd))
+    logger.opt(lazy=True).debug("Running command: {}", lambda: " ".join(cmd))
     try:
         result = subprocess.run(cmd, capture_output=True, text=True, check=True)
     except subprocess.CalledProcessError as e:
@@ -27,8 +98,19 @@ def run_command(cmd: List[str]) -> str:
             e.stderr.strip(),
         )
         raise e
-    logger.trace("Command stdout: {}", result.stdout.strip())
-    return result.stdout.strip()
+    out = result.stdout.strip()
+    logger.trace("Command stdout: {}", out)
+    return out
+
+
+def _run_nocheck(cmd: List[str]) -> Tuple[int, str]:
+    """
+    Like run_command, but return (returncode, stdout) instead of raising
+    on non-zero exit. For queries where failure is an expected outcome.
+    """
+    logger.opt(lazy=True).debug("Running command: {}", lambda: " ".join(cmd))
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    return result.returncode, result.stdout.strip()
 
 
 def run_sbatch(args: List[str]) -> Optional[str]:
@@ -41,7 +123,7 @@ def run_sbatch(args: List[str]) -> Optional[str]:
     except subprocess.CalledProcessError:
         return None
 
-    match = re.search(r"Submitted batch job (\d+)", out)
+    match = _SBATCH_JOB_RE.search(out)
     if not match:
         logger.warning("Could not parse sbatch output: {}", out)
         return None
@@ -50,92 +132,203 @@ def run_sbatch(args: List[str]) -> Optional[str]:
     return job_id
 
 
+@rate_limited(min_interval=2.0)
 def get_scontrol_show_job_details(job_id: str) -> Dict[str, str]:
     """
     Run `scontrol show job <job_id>` → parse key=val tokens → dict.
     """
-    try:
-        out = run_command(["scontrol", "show", "job", job_id])
-    except subprocess.CalledProcessError:
+    if not _VALID_JOBID_RE.match(job_id):
         return {}
 
-    info: Dict[str, str] = {}
-    for token in out.replace("\n", " ").split():
-        if "=" in token:
-            key, val = token.split("=", 1)
-            info[key] = val
-    return info
+    # Non-zero once the job has aged out of the controller
+    returncode, out = _run_nocheck(["scontrol", "show", "job", job_id])
+    if returncode != 0:
+        return {}
+
+    return dict(_SCONTROL_KV_RE.findall(out))
 
 
+@rate_limited(min_interval=2.0)
 def get_sacct_job_details(job_id: str) -> List[Dict[str, str]]:
     """
     Run `sacct -j <job_id> --format=... -P` → parse pipe-separated lines.
+    Returns every row sacct prints for the ID (steps, array tasks, ...).
     """
-    headers = ["JobID", "JobName", "State", "ExitCode", "Reason", "Comment", "Elapsed"]
-    cmd = ["sacct", "-j", job_id, f"--format={','.join(headers)}", "--noheader", "-P"]
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-    except subprocess.CalledProcessError:
+    if not _VALID_JOBID_RE.match(job_id):
         return []
 
-    out = result.stdout.strip()
-    if not out:
-        return []
+    cached = _sacct_cache_get(job_id)
+    if cached is not None:
+        return cached
+
+    job_rows = _run_sacct([job_id]) or []
+    _cache_if_final(job_id, job_rows)
+    return job_rows
 
-    rows = []
-    for line in out.splitlines():
-        parts = line.split("|")
-        # pad/truncate
-        parts = (parts + [""] * len(headers))[: len(headers)]
-        rows.append(dict(zip(headers, parts)))
+
+def get_sacct_job_details_batch(
+    job_ids: List[str],
+) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Run `sacct -j <id1>,<id2>,... --format=... -P` for many jobs, at most
+    _SACCT_JOBS_PER_CALL IDs per call to stay clear of ARG_MAX.
+    Returns rows grouped by the requested ID they belong to: a job ID gets
+    its steps and array tasks, a step ID (`<id>.batch`) gets its own row.
+    """
+    rows: Dict[str, List[Dict[str, str]]] = {}
+    pending: List[str] = []
+    for job_id in job_ids:
+        if not _VALID_JOBID_RE.match(job_id):
+            continue
+        cached = _sacct_cache_get(job_id)
+        if cached is None:
+            pending.append(job_id)
+        else:
+            rows[job_id] = cached
+
+    for i in range(0, len(pending), _SACCT_JOBS_PER_CALL):
+        chunk = pending[i : i + _SACCT_JOBS_PER_CALL]
+        chunk_rows = _run_sacct(chunk)
+        if chunk_rows is None:
+            continue
+
+        requested = set(chunk)
+        for row in chunk_rows:
+            for owner in _sacct_row_owners(row["JobID"], requested):
+                rows.setdefault(owner, []).append(row)
+
+    for job_id in pending:
+        _cache_if_final(job_id, rows.get(job_id))
     return rows
 
 
+def _run_sacct(job_ids: List[str]) -> Optional[List[Dict[str, str]]]:
+    """
+    Run one `sacct -j <ids> --format=... -P` and return its rows,
+    or None if sacct exits non-zero.
+    """
+    cmd = ["sacct", "-j", ",".join(job_ids), _SACCT_FORMAT, "--noheader", "-P"]
+    # Parse rows as sacct writes them instead of buffering the whole output
+    job_rows = []
+    with subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    ) as proc:
+        # -P output is unquoted; QUOTE_NONE keeps '"' in fields verbatim
+        reader = csv.reader(proc.stdout, delimiter="|", quoting=csv.QUOTE_NONE)
+        for parts in reader:
+            if not parts:
+                continue
+            if len(parts) < len(_SACCT_HEADERS):
+                parts += [""] * (len(_SACCT_HEADERS) - len(parts))
+            job_rows.append(dict(zip(_SACCT_HEADERS, parts)))
+    if proc.returncode != 0:
+        return None
+    return job_rows
+
+
+def _sacct_row_owners(row_job_id: str, requested: Set[str]) -> Set[str]:
+    """
+    Requested IDs a sacct row belongs to, e.g. row `777_1.batch` belongs to
+    `777_1.batch`, `777_1` and `777`, whichever of those were requested.
+    """
+    job = row_job_id.split(".", 1)[0]
+    array_job = job.split("_", 1)[0]
+    return {row_job_id, job, array_job} & requested
+
+
+def _sacct_cache_get(job_id: str) -> Optional[List[Dict[str, str]]]:
+    """
+    Fresh copy of a job's memoized rows, or None if it isn't cached.
+    """
+    cached = _sacct_cache.get(job_id)
+    if cached is None:
+        return None
+    _sacct_cache.move_to_end(job_id)
+    return [dict(row) for row in cached]
+
+
+def _cache_if_final(job_id: str, job_rows: Optional[List[Dict[str, str]]]) -> None:
+    """
+    Memoize a job's rows once sacct reports it in a final state.
+    """
+    if job_rows and _sacct_job_is_final(job_id, job_rows):
+        # Own copy, so callers editing their rows can't corrupt the cache
+        _sacct_cache[job_id] = [dict(row) for row in job_rows]
+        if len(_sacct_cache) > _SACCT_CACHE_SIZE:
+            _sacct_cache.popitem(last=False)
+
+
+def _sacct_job_is_final(job_id: str, job_rows: List[Dict[str, str]]) -> bool:
+    """
+    True if the job's own row (not a step) reports a final state.
+    """
+    for row in job_rows:
+        if row["JobID"] == job_id:
+            # e.g. "CANCELLED by 1234"
+            return row["State"].partition(" ")[0] in _SACCT_FINAL_STATES
+    return False
+
+
 def time_to_seconds(timestr: str) -> int:
     """
     Convert "D-HH:MM:SS" or "HH:MM:SS" into total seconds.
     """
-    if "-" in timestr:
-        days_str, rest = timestr.split("-", 1)
+    days_str, dash, rest = timestr.partition("-")
+    if dash:
         days = int(days_str)
     else:
         days, rest = 0, timestr
 
-    h, m, s = map(int, rest.split(":"))
-    total = days * 86400 + h * 3600 + m * 60 + s
-    logger.trace("Parsed {} → {}s", timestr, total)
-    return total
+    h, _, rest = rest.partition(":")
+    m, _, s = rest.partition(":")
+    return days * 86400 + int(h) * 3600 + int(m) * 60 + int(s)
 
 
 def run_detached(func, *args, **kwargs) -> int:
     """
-    Fork+setsid a child to run func(*args, **kwargs), return its PID immediately.
-    Not supported on Windows.
+    Double-fork+setsid a child to run func(*args, **kwargs), return its PID
+    immediately. Not supported on Windows.
     """
     if os.name == "nt":
         raise RuntimeError("run_detached is not supported on Windows")
 
-    def _wrapper(pid_queue: multiprocessing.Queue):
-        # first fork
-        pid = os.fork()
-        if pid > 0:
-            # In parent: send child-PID back and exit wrapper
-            pid_queue.put(pid)
-            return
-
-        # In child: detach the session, then execute
-        os.setsid()
-        func(*args, **kwargs)
-        os._exit(0)
+    # Don't let both processes flush the same buffered output later
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Intermediate child: new session, fork the worker, report its PID.
+        # On failure exit without writing; the parent's read check reports it.
+        try:
+            os.close(read_fd)
+            os.setsid()
+            worker_pid = os.fork()
+            if worker_pid > 0:
+                os.write(write_fd, worker_pid.to_bytes(4, "little"))
+                os._exit(0)
+        except BaseException:
+            logger.exception("Failed to start detached process")
+            os._exit(1)
 
-    pid_q: multiprocessing.Queue = multiprocessing.Queue(1)
-    worker = multiprocessing.Process(target=_wrapper, args=(pid_q,))
-    worker.daemon = False
-    worker.start()
+        # Worker: never return into the caller's stack
+        os.close(write_fd)
+        try:
+            func(*args, **kwargs)
+        except BaseException:
+            logger.exception("Detached process failed")
+            os._exit(1)
+        os._exit(0)
 
-    child_pid = pid_q.get()
-    pid_q.close()
-    return child_pid
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    # A 4-byte write is below PIPE_BUF, so it arrives in one piece
+    pid_bytes = os.read(read_fd, 4)
+    os.close(read_fd)
+    if len(pid_bytes) != 4:
+        raise RuntimeError("Failed to start detached process")
+    return int.from_bytes(pid_bytes, "little")
 
 
 def detach_terminal():